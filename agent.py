@@ -14,12 +14,29 @@ The agent will:
 4. Complete work and submit deliverables
 """
 
-import requests
+import asyncio
+import aiohttp
+import concurrent.futures
+import io
+import mmap
 import time
 import random
+import signal
 import string
+from contextlib import AsyncExitStack
 import json
 import os
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:  # orjson is optional, fall back to the stdlib
+    orjson = None
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+    _loads = json.loads
 
 # Configuration
 BASE_URL = "https://claw-jobs.com/api"
@@ -30,168 +47,443 @@ LIGHTNING_ADDRESS = ""  # Set your Lightning address to receive payments
 # State file to persist API key between runs
 STATE_FILE = "agent_state.json"
 
+# Process-wide connection pool shared by every agent's session, so a fleet of
+# agents reuses one set of TLS connections. Created lazily because aiohttp
+# connectors need a running event loop; reference-counted by the agents using
+# it so the last one out closes it.
+_CONNECTOR: aiohttp.TCPConnector | None = None
+_CONNECTOR_LOOP: asyncio.AbstractEventLoop | None = None
+_CONNECTOR_USERS = 0
+
+
+def _acquire_connector() -> aiohttp.TCPConnector:
+    """Get the shared connector, creating it for the running loop if needed"""
+    global _CONNECTOR, _CONNECTOR_LOOP, _CONNECTOR_USERS
+    loop = asyncio.get_running_loop()
+    if _CONNECTOR is None or _CONNECTOR.closed or _CONNECTOR_LOOP is not loop:
+        # A connector left over from an earlier event loop can't be reused
+        _CONNECTOR = aiohttp.TCPConnector(
+            limit=64, limit_per_host=32, keepalive_timeout=60, ttl_dns_cache=300
+        )
+        _CONNECTOR_LOOP = loop
+        _CONNECTOR_USERS = 0
+    _CONNECTOR_USERS += 1
+    return _CONNECTOR
+
+
+async def _release_connector(connector: aiohttp.TCPConnector):
+    """Drop one agent's use of the shared connector, closing it after the last"""
+    global _CONNECTOR_USERS
+    if connector is not _CONNECTOR:
+        return  # Already replaced by a connector for a newer loop
+    _CONNECTOR_USERS -= 1
+    if _CONNECTOR_USERS == 0:
+        await connector.close()
+
+
+# Shared pool for blocking work (sync LLM clients, CPU-heavy steps), so it
+# never stalls the event loop
+_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+
+# Statuses worth another try: rate limiting and transient server/proxy errors
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class _RetryableStatus(Exception):
+    """Raised by GETs on a _RETRY_STATUSES response so _retry tries again"""
+
+
+def _report_status_failure(retry_state):
+    """Out of retries: report a bad status like other failures, re-raise the rest"""
+    exc = retry_state.outcome.exception()
+    if isinstance(exc, _RetryableStatus):
+        print(f"❌ {exc}")
+        return []
+    raise exc
+
+
+# Retry transient failures with exponential backoff. GETs are safe to repeat
+# after any connection error, timeout or retryable status.
+_retry = retry(
+    stop=stop_after_attempt(4),
+    wait=wait_exponential(multiplier=0.5, max=8),
+    retry=retry_if_exception_type(
+        (aiohttp.ClientConnectionError, asyncio.TimeoutError, _RetryableStatus)
+    ),
+    retry_error_callback=_report_status_failure
+)
+
+# POSTs aren't idempotent: a timeout may fire after the server acted on the
+# request, so only retry when the connection was never made
+_retry_post = retry(
+    stop=stop_after_attempt(4),
+    wait=wait_exponential(multiplier=0.5, max=8),
+    retry=retry_if_exception_type(aiohttp.ClientConnectorError),
+    reraise=True
+)
+
+
+# Gig match results kept per agent before the cache is reset
+_MATCH_CACHE_SIZE = 4096
+
+
+async def _err_text(response: aiohttp.ClientResponse):
+    """Describe a failed response without decoding large non-JSON bodies"""
+    if response.content_type == 'application/json':
+        return _loads(await response.read())
+    # e.g. an HTML error page from a proxy, only read the start of it
+    return (await response.content.read(200)).decode(errors='replace')
+
+
+def _add_sigint_handler(loop: asyncio.AbstractEventLoop, callback):
+    try:
+        loop.add_signal_handler(signal.SIGINT, callback)
+    except NotImplementedError:
+        pass  # No loop signal handlers on Windows, Ctrl-C still raises
+
+
+def _remove_sigint_handler(loop: asyncio.AbstractEventLoop):
+    try:
+        loop.remove_signal_handler(signal.SIGINT)
+    except NotImplementedError:
+        pass
+
 
 class ClawJobsAgent:
-    def __init__(self, name: str, capabilities: list[str]):
+    def __init__(self, name: str, capabilities: list[str], session: aiohttp.ClientSession | None = None,
+                 state_file: str | None = None):
         self.name = name
+        # Agents sharing a process each need their own state file (main_many checks)
+        self.state_file = state_file or STATE_FILE
         self.capabilities = capabilities
+        self._caps_lc = tuple(cap.lower() for cap in capabilities)
+        # (gig id, updated_at) -> whether the gig matches our capabilities
+        self._match_cache: dict[tuple, bool] = {}
+        self._caps_joined = ", ".join(capabilities)
+        self._bio = f"I'm an example agent that can help with {self._caps_joined}."
         self.api_key = None
         self.user_id = None
+        # One HTTP session per agent lifetime, so TCP+TLS connections are reused
+        self.session = session
+        self._owns_session = session is None
+        self._last_state = None
+        # ETag and last body of polled lists, to make unchanged polls cheap
+        self._gigs_cache: dict[str, tuple[str, list[dict]]] = {}
+        self._apps_etag = None
+        self._apps_cache = {}
+        # Cleared the first time the server turns out not to have /gigs/apply_batch
+        self._batch_supported = True
+        self._stop = asyncio.Event()
+        # Accepted gigs being worked on or already submitted
+        self._in_progress: set[str] = set()
+        # Cycles and event handlers in flight, cancelled by stop()
+        self._tasks: set[asyncio.Task] = set()
         self._load_state()
+        # Built once and updated on registration. Kept per agent rather than on
+        # the session, so agents sharing an injected session keep their own key.
+        self._headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            self._headers['x-api-key'] = self.api_key
+    
+    async def __aenter__(self):
+        if self.session is None:
+            # Keep-alive pool so every call after the first skips the TLS handshake.
+            # aiohttp speaks HTTP/1.1 only, so the pool allows enough parallel
+            # connections per host for gathered calls not to queue behind each other.
+            self.session = aiohttp.ClientSession(
+                connector=_acquire_connector(),
+                connector_owner=False,
+                timeout=aiohttp.ClientTimeout(total=30)
+            )
+        return self
+    
+    @property
+    def _http(self) -> aiohttp.ClientSession:
+        """The agent's session, which only exists inside `async with`"""
+        if self.session is None:
+            raise RuntimeError(
+                "ClawJobsAgent has no HTTP session; use it as "
+                "`async with ClawJobsAgent(...) as agent:`"
+            )
+        return self.session
+    
+    async def __aexit__(self, *exc):
+        if self._owns_session and self.session is not None:
+            connector = self.session.connector
+            await self.session.close()
+            self.session = None
+            await _release_connector(connector)
     
     def _load_state(self):
         """Load saved state from file"""
-        if os.path.exists(STATE_FILE):
-            with open(STATE_FILE, 'r') as f:
-                state = json.load(f)
-                self.api_key = state.get('api_key')
-                self.user_id = state.get('user_id')
-                self.name = state.get('name', self.name)
-                print(f"🔄 Loaded existing agent: {self.name}")
+        if os.path.exists(self.state_file) and os.stat(self.state_file).st_size:
+            # Parse straight from a read-only mapping, without copying the file into a string
+            with open(self.state_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if orjson is not None:
+                    with memoryview(mm) as view:
+                        state = _loads(view)
+                else:
+                    state = _loads(mm[:])  # json.loads needs bytes, not a memoryview
+            self.api_key = state.get('api_key')
+            self.user_id = state.get('user_id')
+            self.name = state.get('name', self.name)
+            self._last_state = state
+            print(f"🔄 Loaded existing agent: {self.name}")
     
     def _save_state(self):
-        """Save state to file"""
-        with open(STATE_FILE, 'w') as f:
-            json.dump({
-                'api_key': self.api_key,
-                'user_id': self.user_id,
-                'name': self.name
-            }, f)
-    
-    def _headers(self) -> dict:
-        """Get request headers with auth"""
-        headers = {'Content-Type': 'application/json'}
-        if self.api_key:
-            headers['x-api-key'] = self.api_key
-        return headers
+        """Save state to file atomically, skipping the write if nothing changed"""
+        state = {
+            'api_key': self.api_key,
+            'user_id': self.user_id,
+            'name': self.name
+        }
+        if state == self._last_state:
+            return
+        
+        # Write a temp file and rename over the old one, so a crash
+        # mid-write never leaves a truncated state file behind
+        tmp = self.state_file + ".tmp"
+        with open(tmp, 'wb') as f:
+            f.write(_dumps(state))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.state_file)
+        self._last_state = state
     
-    def register(self) -> bool:
+    @_retry_post
+    async def register(self) -> bool:
         """Register the agent on Claw Jobs"""
-        if self.api_key:
-            print(f"✅ Already registered as {self.name}")
-            return True
-        
         print(f"📝 Registering agent: {self.name}")
         
-        response = requests.post(
+        async with self._http.post(
             f"{BASE_URL}/auth/register",
-            headers=self._headers(),
-            json={
+            headers=self._headers,
+            data=_dumps({
                 "name": self.name,
                 "type": "agent",
                 "capabilities": self.capabilities,
-                "bio": f"I'm an example agent that can help with {', '.join(self.capabilities)}.",
+                "bio": self._bio,
                 "lightning_address": LIGHTNING_ADDRESS or None
-            }
-        )
-        
-        if response.status_code == 201:
-            data = response.json()
-            self.api_key = data['api_key']
-            self.user_id = data['user']['id']
-            self._save_state()
-            print(f"🤖 Agent registered!")
-            print(f"🔑 API Key: {self.api_key[:20]}...")
-            return True
-        else:
-            print(f"❌ Registration failed: {response.json()}")
-            return False
+            })
+        ) as response:
+            if response.status == 201:
+                data = _loads(await response.read())
+                self.api_key = data['api_key']
+                self.user_id = data['user']['id']
+                self._headers['x-api-key'] = self.api_key
+                self._save_state()
+                print(f"🤖 Agent registered!")
+                print(f"🔑 API Key: {self.api_key[:20]}...")
+                return True
+            else:
+                print(f"❌ Registration failed: {await _err_text(response)}")
+                return False
     
-    def browse_gigs(self, status: str = "open") -> list[dict]:
+    @_retry
+    async def browse_gigs(self, status: str = "open") -> list[dict]:
         """Browse available gigs"""
-        response = requests.get(
-            f"{BASE_URL}/gigs",
-            headers=self._headers(),
-            params={"status": status}
-        )
+        headers = self._headers
+        etag, cached = self._gigs_cache.get(status, (None, []))
+        if etag:
+            headers = {**headers, 'If-None-Match': etag}
         
-        if response.status_code == 200:
-            gigs = response.json()
-            print(f"📋 Found {len(gigs)} {status} gigs")
-            return gigs
-        else:
-            print(f"❌ Failed to fetch gigs: {response.status_code}")
-            return []
+        async with self._http.get(
+            f"{BASE_URL}/gigs",
+            headers=headers,
+            # Let the server pre-filter; servers that ignore these params still
+            # return the full list and find_matching_gigs does the matching
+            params={
+                "status": status,
+                "capabilities": ",".join(self.capabilities),
+                "limit": 50
+            }
+        ) as response:
+            if response.status == 304:
+                print(f"📋 {len(cached)} {status} gigs (unchanged)")
+                return cached
+            elif response.status in _RETRY_STATUSES:
+                raise _RetryableStatus(f"Failed to fetch gigs: {response.status}")
+            elif response.status == 200:
+                gigs = _loads(await response.read())
+                if 'ETag' in response.headers:
+                    self._gigs_cache[status] = (response.headers['ETag'], gigs)
+                print(f"📋 Found {len(gigs)} {status} gigs")
+                return gigs
+            else:
+                print(f"❌ Failed to fetch gigs: {response.status}")
+                return []
     
-    def apply_to_gig(self, gig_id: str, proposal: str = None) -> dict | None:
+    @_retry_post
+    async def apply_to_gig(self, gig_id: str, proposal: str = None) -> dict | None:
         """Apply to a gig"""
-        response = requests.post(
+        async with self._http.post(
             f"{BASE_URL}/gigs/{gig_id}/apply",
-            headers=self._headers(),
-            json={"proposal": proposal} if proposal else {}
-        )
+            headers=self._headers,
+            data=_dumps({"proposal": proposal} if proposal else {})
+        ) as response:
+            if response.status == 201:
+                data = _loads(await response.read())
+                print(f"✅ Applied to gig: {data['application']['gig_title']}")
+                return data
+            elif response.status == 409:
+                print(f"⏭️  Already applied to this gig")
+                return None
+            else:
+                print(f"❌ Application failed: {await _err_text(response)}")
+                return None
+    
+    async def apply_to_gigs(self, gig_ids: list[str], proposals: dict[str, str] | None = None) -> list[dict]:
+        """Apply to several gigs in one request"""
+        proposals = proposals or {}
+        if self._batch_supported:
+            applications = await self._apply_batch(gig_ids, proposals)
+            if applications is not None:
+                return applications
         
-        if response.status_code == 201:
-            data = response.json()
-            print(f"✅ Applied to gig: {data['application']['gig_title']}")
-            return data
-        elif response.status_code == 409:
-            print(f"⏭️  Already applied to this gig")
-            return None
-        else:
-            print(f"❌ Application failed: {response.json()}")
-            return None
+        # Server has no batch endpoint, apply to each gig in parallel instead
+        results = await asyncio.gather(
+            *[self.apply_to_gig(gig_id, proposals.get(gig_id)) for gig_id in gig_ids]
+        )
+        return [data['application'] for data in results if data]
+    
+    @_retry_post
+    async def _apply_batch(self, gig_ids: list[str], proposals: dict[str, str]) -> list[dict] | None:
+        """POST to /gigs/apply_batch, or return None if the server doesn't have it"""
+        async with self._http.post(
+            f"{BASE_URL}/gigs/apply_batch",
+            headers=self._headers,
+            data=_dumps({"applications": [
+                {"gig_id": gig_id, "proposal": proposals.get(gig_id)} for gig_id in gig_ids
+            ]})
+        ) as response:
+            if response.status in [200, 201]:
+                data = _loads(await response.read())
+                applications = data.get('applications', [])
+                for application in applications:
+                    print(f"✅ Applied to gig: {application.get('gig_title')}")
+                return applications
+            elif response.status in [404, 405]:
+                self._batch_supported = False
+                return None
+            else:
+                print(f"❌ Batch application failed: {await _err_text(response)}")
+                return []
     
-    def check_applications(self) -> list[dict]:
+    @_retry
+    async def check_applications(self) -> list[dict]:
         """Check status of our applications"""
-        response = requests.get(
+        headers = self._headers
+        if self._apps_etag:
+            headers = {**headers, 'If-None-Match': self._apps_etag}
+        
+        async with self._http.get(
             f"{BASE_URL}/applications",
-            headers=self._headers()
-        )
+            headers=headers
+        ) as response:
+            if response.status == 304:
+                data = self._apps_cache
+            elif response.status in _RETRY_STATUSES:
+                raise _RetryableStatus(f"Failed to fetch applications: {response.status}")
+            elif response.status == 200:
+                data = _loads(await response.read())
+                self._apps_etag = response.headers.get('ETag')
+                self._apps_cache = data
+            else:
+                print(f"❌ Failed to fetch applications")
+                return []
         
-        if response.status_code == 200:
-            data = response.json()
-            apps = data.get('applications', [])
-            stats = data.get('stats', {})
-            print(f"📊 Applications: {stats.get('total', 0)} total, "
-                  f"{stats.get('accepted', 0)} accepted, "
-                  f"{stats.get('pending', 0)} pending")
-            return apps
-        else:
-            print(f"❌ Failed to fetch applications")
-            return []
+        apps = data.get('applications', [])
+        stats = data.get('stats', {})
+        print(f"📊 Applications: {stats.get('total', 0)} total, "
+              f"{stats.get('accepted', 0)} accepted, "
+              f"{stats.get('pending', 0)} pending")
+        return apps
     
-    def submit_deliverable(self, gig_id: str, content: str) -> bool:
+    @_retry_post
+    async def submit_deliverable(self, gig_id: str, content: str) -> bool:
         """Submit work for a gig"""
-        response = requests.post(
+        async with self._http.post(
             f"{BASE_URL}/deliverables",
-            headers=self._headers(),
-            json={
+            headers=self._headers,
+            data=_dumps({
                 "gig_id": gig_id,
                 "content": content,
                 "notes": "Completed by example agent"
-            }
-        )
+            })
+        ) as response:
+            if response.status in [200, 201]:
+                print(f"📦 Deliverable submitted!")
+                return True
+            else:
+                print(f"❌ Submission failed: {await _err_text(response)}")
+                return False
+    
+    async def subscribe_gigs(self):
+        """Yield gig events pushed by the server until the stream closes or we stop"""
+        async with self._http.ws_connect(
+            f"{BASE_URL.replace('https', 'wss', 1)}/gigs/stream",
+            headers=self._headers,
+            heartbeat=30
+        ) as ws:
+            print("📡 Subscribed to gig stream")
+            # Closing the socket on stop() ends the iteration below
+            closer = asyncio.create_task(self._close_on_stop(ws))
+            try:
+                async for msg in ws:
+                    if msg.type != aiohttp.WSMsgType.TEXT:
+                        continue
+                    try:
+                        event = _loads(msg.data)
+                    except ValueError:
+                        print(f"❌ Skipping malformed event: {msg.data[:200]!r}")
+                        continue
+                    yield event
+            finally:
+                closer.cancel()
+    
+    async def _close_on_stop(self, ws: aiohttp.ClientWebSocketResponse):
+        await self._stop.wait()
+        await ws.close()
+    
+    def find_matching_gigs(self, gigs: list[dict], fallback: bool = True) -> list[dict]:
+        """Find the gigs that match our capabilities"""
+        matches = [gig for gig in gigs if self._gig_matches(gig)]
         
-        if response.status_code in [200, 201]:
-            print(f"📦 Deliverable submitted!")
-            return True
-        else:
-            print(f"❌ Submission failed: {response.json()}")
-            return False
-    
-    def find_matching_gig(self, gigs: list[dict]) -> dict | None:
-        """Find a gig that matches our capabilities"""
-        for gig in gigs:
-            # Check if gig category or requirements match our capabilities
-            gig_category = gig.get('category', '').lower()
-            gig_caps = gig.get('required_capabilities', [])
-            
-            # Simple matching: category contains any of our capabilities
-            for cap in self.capabilities:
-                if cap.lower() in gig_category or cap.lower() in str(gig_caps).lower():
-                    return gig
-            
-            # Also match on title/description keywords
-            gig_text = f"{gig.get('title', '')} {gig.get('description', '')}".lower()
-            for cap in self.capabilities:
-                if cap.lower() in gig_text:
-                    return gig
+        # If no match, take the first available gig (agents gotta eat!)
+        if fallback and not matches and gigs:
+            matches.append(gigs[0])
+        return matches
+    
+    def _gig_matches(self, gig: dict) -> bool:
+        """Check one gig, reusing the answer for unchanged gigs seen in earlier cycles"""
+        # Only gigs carrying updated_at can be cached: without it an edited
+        # gig would keep its old answer
+        key = None
+        if gig.get('id') is not None and gig.get('updated_at') is not None:
+            key = (gig['id'], gig['updated_at'])
+            if key in self._match_cache:
+                return self._match_cache[key]
+        
+        # Match category, requirements, title and description in a single scan
+        haystack = " ".join((
+            gig.get('category') or '',
+            " ".join(gig.get('required_capabilities') or ()),
+            gig.get('title') or '',
+            gig.get('description') or ''
+        )).lower()
+        matched = any(cap in haystack for cap in self._caps_lc)
         
-        # If no match, return first available gig (agents gotta eat!)
-        return gigs[0] if gigs else None
+        if key is not None:
+            if len(self._match_cache) >= _MATCH_CACHE_SIZE:
+                self._match_cache.clear()
+            self._match_cache[key] = matched
+        return matched
     
-    def do_work(self, gig: dict) -> str:
+    async def do_work(self, gig: dict) -> str:
+        """Do the work for a gig on the shared executor"""
+        return await asyncio.get_running_loop().run_in_executor(_EXECUTOR, self._do_work_sync, gig)
+    
+    def _do_work_sync(self, gig: dict) -> str:
         """
         Simulate doing work on a gig.
         
@@ -202,88 +494,210 @@ class ClawJobsAgent:
         - etc.
         """
         title = gig.get('title', 'Unknown gig')
-        description = gig.get('description', '')
         
         print(f"🔨 Working on: {title}")
         
         # Simulate work time
         time.sleep(2)
         
-        # In reality, you'd do actual work here!
-        # This is just a placeholder response
-        deliverable = f"""
+        # Build the deliverable incrementally so streamed output (e.g. LLM
+        # tokens) can be appended without re-copying what's already written
+        buf = io.StringIO()
+        buf.write(f"""
 # Deliverable for: {title}
 
 ## Summary
 This is an example deliverable from the Claw Jobs example agent.
 
-## Work Completed
-Based on the gig requirements:
-{description[:200]}...
+""")
+        for chunk in self._work_stream(gig):
+            buf.write(chunk)
+        buf.write(f"""
+## Notes
+- Completed by: {self.name}
+- Capabilities used: {self._caps_joined}
 
-I have completed the requested work. In a real agent, this would contain:
+Thank you for using Claw Jobs! ⚡
+""")
+        return buf.getvalue()
+    
+    def _work_stream(self, gig: dict):
+        """
+        Yield the body of the deliverable in chunks.
+        
+        In reality, you'd do actual work here (e.g. stream tokens from an LLM)!
+        This is just a placeholder response.
+        """
+        description = gig.get('description', '')
+        yield "## Work Completed\n"
+        yield "Based on the gig requirements:\n"
+        yield f"{description[:200]}...\n\n"
+        yield """I have completed the requested work. In a real agent, this would contain:
 - Actual research findings
 - Generated content
 - Data analysis results
 - Or whatever the gig required
-
-## Notes
-- Completed by: {self.name}
-- Capabilities used: {', '.join(self.capabilities)}
-
-Thank you for using Claw Jobs! ⚡
 """
-        return deliverable
     
-    def run_once(self):
+    async def run_once(self):
         """Run one cycle: browse, apply, check, work"""
         print("\n" + "="*50)
         print(f"🤖 {self.name} - Running cycle")
         print("="*50 + "\n")
         
-        # 1. Browse open gigs
-        gigs = self.browse_gigs("open")
+        # 1. Browse open gigs and check our applications (independent, so overlap them)
+        gigs, apps = await asyncio.gather(
+            self.browse_gigs("open"),
+            self.check_applications()
+        )
         
+        # 2. Find matching gigs and apply to all of them at once
         if not gigs:
             print("😴 No open gigs available")
+        else:
+            matching_gigs = self.find_matching_gigs(gigs)
+            for gig in matching_gigs:
+                print(f"\n🎯 Found matching gig: {gig['title']}")
+                print(f"   Budget: {gig['budget_sats']} sats")
+            if matching_gigs:
+                await self.apply_to_gigs([gig['id'] for gig in matching_gigs])
+        
+        # 3. Work on accepted gigs, submitting them in parallel
+        accepted = [
+            app.get('gig', {}) for app in apps
+            if app['status'] == 'accepted' and app.get('gig', {}).get('id')
+        ]
+        await asyncio.gather(*[self._complete_gig(gig) for gig in accepted])
+    
+    async def _complete_gig(self, gig: dict):
+        """Do the work for an accepted gig and submit the deliverable, once per gig"""
+        # Polled cycles and pushed events can both report the same acceptance
+        if gig['id'] in self._in_progress:
             return
+        self._in_progress.add(gig['id'])
         
-        # 2. Find a matching gig and apply
-        matching_gig = self.find_matching_gig(gigs)
-        if matching_gig:
-            print(f"\n🎯 Found matching gig: {matching_gig['title']}")
-            print(f"   Budget: {matching_gig['budget_sats']} sats")
-            self.apply_to_gig(matching_gig['id'])
+        submitted = False
+        try:
+            print(f"\n🎉 Gig accepted! Working on: {gig.get('title')}")
+            deliverable = await self.do_work(gig)
+            submitted = await self.submit_deliverable(gig['id'], deliverable)
+        finally:
+            # Keep submitted gigs so they're never sent twice; retry failed ones later
+            if not submitted:
+                self._in_progress.discard(gig['id'])
+    
+    async def handle_event(self, event: dict):
+        """React to a single pushed event"""
+        if event.get('type') == 'gig.created':
+            gig = event['gig']
+            # Same matching as a polled cycle; the fallback pick is left to that
+            if self.find_matching_gigs([gig], fallback=False):
+                print(f"\n🎯 New matching gig: {gig.get('title')}")
+                await self.apply_to_gig(gig['id'])
+        elif event.get('type') == 'application.accepted':
+            gig = event.get('application', {}).get('gig', {})
+            if gig.get('id'):
+                await self._complete_gig(gig)
+    
+    async def run_loop(self, interval_seconds: int = 300, handle_sigint: bool = True):
+        """
+        Run continuously until stopped.
         
-        # 3. Check our applications
-        print("\n📬 Checking applications...")
-        apps = self.check_applications()
+        A full cycle runs every interval. While the server's gig stream is
+        available, pushed events are also handled as they arrive. Pass
+        handle_sigint=False when the caller manages Ctrl-C itself (e.g. main_many).
+        """
+        print("🚀 Starting agent loop")
+        # A previous stop() mustn't end this run straight away
+        self._stop.clear()
         
-        # 4. Work on accepted gigs
-        for app in apps:
-            if app['status'] == 'accepted':
-                gig = app.get('gig', {})
-                gig_id = gig.get('id')
-                if gig_id:
-                    print(f"\n🎉 Gig accepted! Working on: {gig.get('title')}")
-                    deliverable = self.do_work(gig)
-                    self.submit_deliverable(gig_id, deliverable)
-    
-    def run_loop(self, interval_seconds: int = 300):
-        """Run continuously, checking for work every interval"""
-        print(f"🚀 Starting agent loop (checking every {interval_seconds}s)")
+        loop = asyncio.get_running_loop()
+        if handle_sigint:
+            _add_sigint_handler(loop, self.stop)
         
-        while True:
+        # Polling keeps applications checked even while the stream is connected
+        poller = asyncio.create_task(self._run_poll(interval_seconds))
+        try:
+            await self._run_push(interval_seconds)
+            await poller
+        finally:
+            for task in [poller, *self._tasks]:
+                task.cancel()
+            await asyncio.gather(poller, *self._tasks, return_exceptions=True)
+            if handle_sigint:
+                _remove_sigint_handler(loop)
+        
+        print("👋 Agent stopped")
+    
+    async def _run_push(self, interval_seconds: int):
+        """Handle pushed events until stopped, reconnecting if the stream drops"""
+        while not self._stop.is_set():
             try:
-                self.run_once()
+                async for event in self.subscribe_gigs():
+                    # Handle events concurrently so slow work doesn't hold up the stream
+                    self._spawn(self._logged(self.handle_event(event)))
+            except aiohttp.WSServerHandshakeError as e:
+                if e.status == 404:
+                    print(f"📡 No gig stream available, polling every {interval_seconds}s")
+                    return
+                print(f"❌ Stream error: {e}")
             except Exception as e:
-                print(f"❌ Error: {e}")
+                print(f"❌ Stream error: {e!r}")
             
-            print(f"\n💤 Sleeping for {interval_seconds}s...")
-            time.sleep(interval_seconds)
+            if not self._stop.is_set():
+                await self._sleep(min(interval_seconds, 30), "Reconnecting to gig stream in")
+    
+    async def _run_poll(self, interval_seconds: int):
+        """Run a full cycle every interval"""
+        while not self._stop.is_set():
+            await self._run_cycle()
+            if not self._stop.is_set():
+                await self._sleep(interval_seconds)
+    
+    async def _logged(self, coro):
+        """Await coro, printing its errors instead of raising them"""
+        try:
+            return await coro
+        except Exception as e:
+            print(f"❌ Error: {e}")
+    
+    async def _run_cycle(self):
+        """Run one cycle as a task, so stop() can interrupt it mid-flight"""
+        task = self._spawn(self.run_once())
+        try:
+            await task
+        except asyncio.CancelledError:
+            if not self._stop.is_set():
+                raise
+            print("⏹️  Cycle cancelled")
+        except Exception as e:
+            print(f"❌ Error: {e}")
+    
+    def _spawn(self, coro) -> asyncio.Task:
+        """Start coro as a task that stop() will cancel"""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+    
+    async def _sleep(self, interval_seconds: float, what: str = "Sleeping for"):
+        """Sleep for about interval_seconds, waking early if stopped"""
+        # Jitter keeps agents sharing a deploy from polling in lockstep
+        delay = interval_seconds + random.uniform(0, interval_seconds * 0.1)
+        print(f"\n💤 {what} {delay:.0f}s...")
+        try:
+            await asyncio.wait_for(self._stop.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+    
+    def stop(self):
+        """Stop a running loop, cancelling whatever it is doing right now"""
+        self._stop.set()
+        for task in list(self._tasks):
+            task.cancel()
 
 
-def main():
+async def main():
     print("""
     ╔═══════════════════════════════════════════╗
     ║     Claw Jobs Example Agent 🤖⚡          ║
@@ -292,23 +706,53 @@ def main():
     """)
     
     # Create agent
-    agent = ClawJobsAgent(
+    async with ClawJobsAgent(
         name=AGENT_NAME,
         capabilities=CAPABILITIES
-    )
-    
-    # Register if needed
-    if not agent.register():
-        print("Failed to register. Exiting.")
-        return
-    
-    # Run one cycle (or use run_loop for continuous operation)
-    agent.run_once()
+    ) as agent:
+        # Register if needed (a loaded state file already has an API key)
+        if not agent.api_key and not await agent.register():
+            print("Failed to register. Exiting.")
+            return
+        
+        # Run one cycle (or use run_loop for continuous operation)
+        await agent.run_once()
     
     print("\n" + "="*50)
-    print("✨ Done! To run continuously, use: agent.run_loop()")
+    print("✨ Done! To run continuously, use:")
+    print("   async with ClawJobsAgent(...) as agent: await agent.run_loop()")
     print("="*50)
 
 
+async def main_many(agents: list[ClawJobsAgent], interval_seconds: int = 300):
+    """Run several agents concurrently over the shared connection pool"""
+    # Agents sharing a state file would load (or overwrite) one API key
+    state_files = [os.path.abspath(agent.state_file) for agent in agents]
+    if len(set(state_files)) != len(state_files):
+        raise ValueError("Every agent passed to main_many needs its own state_file")
+    
+    loop = asyncio.get_running_loop()
+    async with AsyncExitStack() as stack:
+        for agent in agents:
+            await stack.enter_async_context(agent)
+        
+        # Register any agents without a saved API key
+        registered = await asyncio.gather(
+            *[agent.register() for agent in agents if not agent.api_key]
+        )
+        if not all(registered):
+            print("Failed to register every agent. Exiting.")
+            return
+        
+        # One Ctrl-C stops the whole fleet
+        _add_sigint_handler(loop, lambda: [agent.stop() for agent in agents])
+        try:
+            await asyncio.gather(
+                *[agent.run_loop(interval_seconds, handle_sigint=False) for agent in agents]
+            )
+        finally:
+            _remove_sigint_handler(loop)
+
+
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -0,0 +1,342 @@
+"""Tests for ClawJobsAgent against a local aiohttp server"""
+
+import asyncio
+import contextlib
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from tenacity import wait_none
+
+import agent
+
+
+def research_gig(gig_id: str) -> dict:
+    return {"id": gig_id, "title": f"Research {gig_id}", "category": "research", "budget_sats": 1}
+
+
+RETRIED_METHODS = ("register", "browse_gigs", "apply_to_gig", "_apply_batch",
+                   "check_applications", "submit_deliverable")
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    """Keep retries but drop their backoff sleeps"""
+    for method in RETRIED_METHODS:
+        monkeypatch.setattr(getattr(agent.ClawJobsAgent, method).retry, "wait", wait_none())
+
+
+def make_app(hits: dict, stream_handler=None, routes=None) -> web.Application:
+    """Fake API recording calls in hits; routes maps (method, path) to handlers that replace the defaults"""
+    async def gigs(request):
+        hits["gigs"] += 1
+        return web.json_response([])
+
+    async def applications(request):
+        return web.json_response({"applications": [], "stats": {}})
+
+    async def apply(request):
+        hits["applied"].append(request.match_info["id"])
+        return web.json_response({"application": {"gig_title": request.match_info["id"]}}, status=201)
+
+    handlers = {
+        ("GET", "/api/gigs"): gigs,
+        ("GET", "/api/applications"): applications,
+        ("POST", "/api/gigs/{id}/apply"): apply,
+    }
+    if stream_handler:
+        handlers[("GET", "/api/gigs/stream")] = stream_handler
+    handlers.update(routes or {})
+
+    app = web.Application()
+    # Fixed paths first, so /gigs/apply_batch isn't taken by /gigs/{id}/apply
+    for (method, path), handler in sorted(handlers.items(), key=lambda item: "{" in item[0][1]):
+        app.router.add_route(method, path, handler)
+    return app
+
+
+@contextlib.asynccontextmanager
+async def serve(app: web.Application, monkeypatch):
+    """Serve app locally and point the agent's BASE_URL at it"""
+    server = TestServer(app)
+    await server.start_server()
+    monkeypatch.setattr(agent, "BASE_URL", str(server.make_url("/api")))
+    try:
+        yield
+    finally:
+        await server.close()
+
+
+def new_agent(tmp_path, name: str = "test") -> agent.ClawJobsAgent:
+    return agent.ClawJobsAgent(name, ["research"], state_file=str(tmp_path / f"{name}.json"))
+
+
+async def wait_for(done) -> None:
+    while not done():
+        await asyncio.sleep(0.01)
+
+
+async def run_until(app: web.Application, tmp_path, monkeypatch, done) -> None:
+    """Run the agent loop against app until done() is true, then stop it"""
+    async with serve(app, monkeypatch):
+        async with new_agent(tmp_path) as a:
+            loop_task = asyncio.create_task(a.run_loop(0.05, handle_sigint=False))
+            await asyncio.wait_for(wait_for(done), 5)
+            a.stop()
+            await asyncio.wait_for(loop_task, 5)
+
+
+def test_falls_back_to_polling_without_stream(tmp_path, monkeypatch):
+    hits = {"gigs": 0, "applied": []}
+    app = make_app(hits)
+
+    asyncio.run(run_until(app, tmp_path, monkeypatch, lambda: hits["gigs"] >= 3))
+
+    assert hits["gigs"] >= 3
+
+
+def test_stream_skips_malformed_frames_and_reconnects(tmp_path, monkeypatch):
+    hits = {"gigs": 0, "applied": [], "connections": 0}
+
+    async def stream(request):
+        hits["connections"] += 1
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        if hits["connections"] == 1:
+            await ws.send_str("not json")
+            await ws.send_json({"type": "gig.created", "gig": {"id": "cooking", "title": "Bake a cake"}})
+            await ws.send_json({"type": "gig.created", "gig": research_gig("g1")})
+            await ws.close()
+        else:
+            await ws.send_json({"type": "gig.created", "gig": research_gig("g2")})
+            async for _ in ws:
+                pass
+        return ws
+
+    app = make_app(hits, stream)
+
+    asyncio.run(run_until(app, tmp_path, monkeypatch, lambda: {"g1", "g2"} <= set(hits["applied"])))
+
+    assert hits["connections"] >= 2
+    assert "cooking" not in hits["applied"]
+
+
+def test_network_calls_need_the_context_manager(tmp_path):
+    a = new_agent(tmp_path)
+
+    with pytest.raises(RuntimeError, match="async with ClawJobsAgent"):
+        asyncio.run(a.browse_gigs())
+
+
+def test_gets_retry_on_retryable_status(tmp_path, monkeypatch, no_backoff):
+    hits = {"gigs": 0, "applied": []}
+
+    async def flaky_gigs(request):
+        hits["gigs"] += 1
+        if hits["gigs"] < 3:
+            return web.Response(status=503)
+        return web.json_response([research_gig("g1")])
+
+    app = make_app(hits, routes={("GET", "/api/gigs"): flaky_gigs})
+
+    async def flow():
+        async with serve(app, monkeypatch), new_agent(tmp_path) as a:
+            return await a.browse_gigs()
+
+    assert [gig["id"] for gig in asyncio.run(flow())] == ["g1"]
+    assert hits["gigs"] == 3
+
+
+def test_gets_give_up_on_persistent_status(tmp_path, monkeypatch, no_backoff):
+    hits = {"gigs": 0, "applied": []}
+
+    async def down(request):
+        hits["gigs"] += 1
+        return web.Response(status=502)
+
+    app = make_app(hits, routes={("GET", "/api/gigs"): down})
+
+    async def flow():
+        async with serve(app, monkeypatch), new_agent(tmp_path) as a:
+            return await a.browse_gigs()
+
+    assert asyncio.run(flow()) == []
+    assert hits["gigs"] == 4
+
+
+def test_apply_to_gigs_uses_batch_endpoint(tmp_path, monkeypatch):
+    hits = {"gigs": 0, "applied": [], "batches": []}
+
+    async def apply_batch(request):
+        body = await request.json()
+        hits["batches"].append([app["gig_id"] for app in body["applications"]])
+        return web.json_response(
+            {"applications": [{"gig_title": app["gig_id"]} for app in body["applications"]]}, status=201
+        )
+
+    app = make_app(hits, routes={("POST", "/api/gigs/apply_batch"): apply_batch})
+
+    async def flow():
+        async with serve(app, monkeypatch), new_agent(tmp_path) as a:
+            return await a.apply_to_gigs(["g1", "g2"])
+
+    assert len(asyncio.run(flow())) == 2
+    assert hits["batches"] == [["g1", "g2"]]
+    assert hits["applied"] == []
+
+
+def test_apply_to_gigs_falls_back_and_remembers_missing_batch(tmp_path, monkeypatch):
+    hits = {"gigs": 0, "applied": [], "batches": 0}
+
+    async def no_batch(request):
+        hits["batches"] += 1
+        return web.Response(status=404)
+
+    app = make_app(hits, routes={("POST", "/api/gigs/apply_batch"): no_batch})
+
+    async def flow():
+        async with serve(app, monkeypatch), new_agent(tmp_path) as a:
+            await a.apply_to_gigs(["g1", "g2"])
+            await a.apply_to_gigs(["g3"])
+
+    asyncio.run(flow())
+
+    assert sorted(hits["applied"]) == ["g1", "g2", "g3"]
+    assert hits["batches"] == 1
+
+
+def test_match_cache_follows_gig_edits(tmp_path):
+    a = new_agent(tmp_path)
+
+    assert not a.find_matching_gigs([{"id": "1", "title": "Cook"}], fallback=False)
+    assert a.find_matching_gigs([{"id": "1", "title": "research"}], fallback=False)
+
+    # With updated_at the answer is cached until the gig changes
+    assert not a.find_matching_gigs([{"id": "2", "title": "Cook", "updated_at": "t1"}], fallback=False)
+    assert a.find_matching_gigs([{"id": "2", "title": "research", "updated_at": "t2"}], fallback=False)
+
+
+def test_timed_out_post_is_not_resent_but_get_is(tmp_path, monkeypatch, no_backoff):
+    hits = {"gigs": 0, "applied": []}
+
+    async def slow_first_gigs(request):
+        hits["gigs"] += 1
+        if hits["gigs"] == 1:
+            await asyncio.sleep(1)
+        return web.json_response([])
+
+    async def slow_apply(request):
+        hits["applied"].append(request.match_info["id"])
+        await asyncio.sleep(1)
+        return web.json_response({"application": {"gig_title": "g1"}}, status=201)
+
+    app = make_app(hits, routes={
+        ("GET", "/api/gigs"): slow_first_gigs,
+        ("POST", "/api/gigs/{id}/apply"): slow_apply,
+    })
+
+    async def flow():
+        async with serve(app, monkeypatch):
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=0.2)) as session:
+                a = agent.ClawJobsAgent("test", ["research"], session=session,
+                                        state_file=str(tmp_path / "state.json"))
+                with pytest.raises(asyncio.TimeoutError):
+                    await a.apply_to_gig("g1")
+                assert await a.browse_gigs() == []
+
+    asyncio.run(flow())
+
+    assert hits["applied"] == ["g1"]
+    assert hits["gigs"] == 2
+
+
+def test_run_loop_can_run_again_after_stop(tmp_path, monkeypatch):
+    hits = {"gigs": 0, "applied": []}
+    app = make_app(hits)
+
+    async def flow():
+        async with serve(app, monkeypatch), new_agent(tmp_path) as a:
+            for runs in (1, 2):
+                loop_task = asyncio.create_task(a.run_loop(0.05, handle_sigint=False))
+                await asyncio.wait_for(wait_for(lambda: hits["gigs"] >= runs), 5)
+                a.stop()
+                await asyncio.wait_for(loop_task, 5)
+
+    asyncio.run(flow())
+
+    assert hits["gigs"] >= 2
+
+
+def test_accepted_gig_is_submitted_once_from_stream_and_poll(tmp_path, monkeypatch):
+    hits = {"gigs": 0, "applied": [], "deliverables": []}
+    accepted = {"status": "accepted", "gig": research_gig("g1")}
+    monkeypatch.setattr(agent.time, "sleep", lambda seconds: None)
+
+    async def applications(request):
+        return web.json_response({"applications": [accepted], "stats": {}})
+
+    async def deliverables(request):
+        hits["deliverables"].append((await request.json())["gig_id"])
+        return web.json_response({}, status=201)
+
+    async def stream(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json({"type": "application.accepted", "application": accepted})
+        async for _ in ws:
+            pass
+        return ws
+
+    app = make_app(hits, stream, routes={
+        ("GET", "/api/applications"): applications,
+        ("POST", "/api/deliverables"): deliverables,
+    })
+
+    # Let several polled cycles see the same accepted application
+    asyncio.run(run_until(app, tmp_path, monkeypatch,
+                          lambda: hits["deliverables"] and hits["gigs"] >= 4))
+
+    assert hits["deliverables"] == ["g1"]
+
+
+def test_main_many_runs_agents_over_shared_connector(tmp_path, monkeypatch):
+    hits = {"gigs": 0, "applied": [], "keys": set()}
+    agents = [new_agent(tmp_path, "a0"), new_agent(tmp_path, "a1")]
+
+    async def register(request):
+        name = (await request.json())["name"]
+        return web.json_response({"api_key": f"key-{name}", "user": {"id": name}}, status=201)
+
+    async def gigs(request):
+        hits["gigs"] += 1
+        hits["keys"].add(request.headers.get("x-api-key"))
+        return web.json_response([])
+
+    app = make_app(hits, routes={
+        ("POST", "/api/auth/register"): register,
+        ("GET", "/api/gigs"): gigs,
+    })
+
+    async def flow():
+        async with serve(app, monkeypatch):
+            fleet = asyncio.create_task(agent.main_many(agents, 0.05))
+            await asyncio.wait_for(wait_for(lambda: len(hits["keys"]) == 2), 5)
+            assert agents[0].session.connector is agents[1].session.connector
+            for a in agents:
+                a.stop()
+            await asyncio.wait_for(fleet, 5)
+
+    asyncio.run(flow())
+
+    assert hits["keys"] == {"key-a0", "key-a1"}
+    assert agent._CONNECTOR.closed
+    assert (tmp_path / "a0.json").exists() and (tmp_path / "a1.json").exists()
+
+
+def test_main_many_rejects_shared_state_file(tmp_path):
+    state_file = str(tmp_path / "state.json")
+    agents = [agent.ClawJobsAgent(name, ["research"], state_file=state_file) for name in ("a0", "a1")]
+
+    with pytest.raises(ValueError, match="own state_file"):
+        asyncio.run(agent.main_many(agents))